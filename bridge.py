@@ -0,0 +1,129 @@
+import json
+import logging
+import traceback
+
+import media_trace
+from tool_executor import executor as tool_executor
+
+logger = logging.getLogger(__name__)
+
+def handle_twilio_message(session, message):
+    """Handle a single message from the Twilio media stream, returns False when the stream ends"""
+    if session.recorder:
+        session.recorder.record(media_trace.TWILIO_IN, message)
+        
+    # Parse Twilio message
+    twilio_msg = json.loads(message)
+    event = twilio_msg['event']
+    if event == 'media':
+        # Forward the base64 payload to OpenAI as-is
+        session.frames_from_twilio += 1
+        audio_append = session.audio_append
+        audio_append['audio'] = twilio_msg['media']['payload']
+        session.send_to_openai(audio_append)
+        # Don't keep the frame alive until the next one arrives
+        audio_append['audio'] = None
+        
+    elif event == 'start':
+        session.stream_sid = twilio_msg['start']['streamSid']
+        session.call_sid = twilio_msg['start'].get('callSid')
+        session.media_out['streamSid'] = session.stream_sid
+        logger.info(f"Media stream {session.stream_sid} started for call {session.call_sid}")
+        
+    elif event == 'stop':
+        return False
+        
+    return True
+
+def handle_openai_message(session, message):
+    """Handle messages from OpenAI WebSocket"""
+    try:
+        if session.recorder:
+            session.recorder.record(media_trace.OPENAI_IN, message)
+            
+        msg = json.loads(message)
+        msg_type = msg.get('type')
+        
+        if msg_type == 'response.audio.delta':
+            # Send audio to Twilio
+            session.frames_to_twilio += 1
+            media_out = session.media_out
+            media_out['media']['payload'] = msg['delta']
+            session.send_to_twilio(media_out)
+            media_out['media']['payload'] = None
+            
+        elif msg_type == 'response.function_call_arguments.done':
+            # Run the tool off the socket thread so audio keeps flowing
+            submit_tool_call(session, msg)
+            
+        elif msg_type == 'response.created':
+            with session.tool_lock:
+                session.response_active = True
+                
+        elif msg_type == 'response.done':
+            with session.tool_lock:
+                session.response_active = False
+            request_tool_response(session)
+            
+        elif msg_type == 'error':
+            logger.error(f"OpenAI error: {msg['error']}")
+            
+        elif msg_type == 'session.updated':
+            logger.info("Session configuration updated")
+            
+        elif msg_type == 'response.text.delta':
+            logger.info(f"AI response: {msg.get('delta', '')}")
+            
+    except Exception as e:
+        logger.error(f"Error handling OpenAI message: {str(e)}")
+        logger.error(traceback.format_exc())
+
+def submit_tool_call(session, msg):
+    """Run a function call from the model and send its result back when it completes"""
+    name = msg.get('name')
+    call_id = msg.get('call_id')
+    logger.info(f"Model called tool {name} ({call_id}) on stream {session.stream_sid}")
+    with session.tool_lock:
+        session.pending_tool_calls += 1
+        # Function calls are only emitted while a response is in progress
+        session.response_active = True
+    
+    answered = []
+    
+    def on_result(output, elapsed_ms):
+        answered.append(True)
+        # Results arrive on several worker and timer threads at once
+        with session.tool_lock:
+            session.tool_calls += 1
+            session.tool_ms += elapsed_ms
+        session.send_to_openai({
+            'type': 'conversation.item.create',
+            'item': {
+                'type': 'function_call_output',
+                'call_id': call_id,
+                'output': output
+            }
+        })
+        with session.tool_lock:
+            session.pending_tool_calls -= 1
+            session.tool_results_unanswered = True
+        request_tool_response(session)
+        
+    try:
+        queued = tool_executor.submit(name, msg.get('arguments'), on_result)
+    except Exception as e:
+        logger.error(f"Error submitting tool {name}: {str(e)}")
+        logger.error(traceback.format_exc())
+        queued = False
+    if not queued and not answered:
+        # Never leave the call outstanding, or the model is not asked to respond again
+        on_result(json.dumps({'error': f"Tool {name} could not be run"}), 0.0)
+
+def request_tool_response(session):
+    """Ask the model to respond to tool results once none are outstanding and its previous response is done"""
+    with session.tool_lock:
+        if session.pending_tool_calls or session.response_active or not session.tool_results_unanswered:
+            return
+        session.tool_results_unanswered = False
+        session.response_active = True
+    session.send_to_openai({'type': 'response.create'})
@@ -0,0 +1,119 @@
+import sys
+import json
+import time
+import threading
+import logging
+
+import media_trace
+
+logger = logging.getLogger(__name__)
+
+# Upper bound for the bridge's own per-call state, excluding the sockets themselves
+CALL_SESSION_BYTE_BUDGET = 1536
+
+
+class CallSession:
+    """Everything the bridge keeps for one call"""
+
+    __slots__ = (
+        'id', 'stream_sid', 'call_sid', 'twilio_ws', 'openai_ws', 'recorder', 'started_at',
+        'frames_from_twilio', 'frames_to_twilio', 'tool_calls', 'tool_ms',
+        'tool_lock', 'pending_tool_calls', 'tool_results_unanswered', 'response_active',
+        'audio_append', 'media_out'
+    )
+
+    def __init__(self, session_id, twilio_ws, recorder=None):
+        self.id = session_id
+        self.stream_sid = None
+        self.call_sid = None
+        self.twilio_ws = twilio_ws
+        self.openai_ws = None
+        self.recorder = recorder
+        self.started_at = time.monotonic()
+        self.frames_from_twilio = 0
+        self.frames_to_twilio = 0
+        self.tool_calls = 0
+        self.tool_ms = 0.0
+        # Tool results arrive on worker threads; the model is asked to respond once
+        # all of them are in and its previous response is done
+        self.tool_lock = threading.Lock()
+        self.pending_tool_calls = 0
+        self.tool_results_unanswered = False
+        self.response_active = False
+        # Reused for every audio frame. audio_append is only touched by the Twilio
+        # receive thread and media_out only by the OpenAI socket thread.
+        self.audio_append = {'type': 'input_audio_buffer.append', 'audio': None}
+        self.media_out = {'event': 'media', 'streamSid': None, 'media': {'payload': None}}
+
+    def send_to_openai(self, msg):
+        conn = self.openai_ws
+        if conn is None:
+            return
+        payload = json.dumps(msg)
+        conn.send(payload)
+        if self.recorder:
+            self.recorder.record(media_trace.TO_OPENAI, payload)
+
+    def send_to_twilio(self, msg):
+        conn = self.twilio_ws
+        if conn is None:
+            return
+        payload = json.dumps(msg)
+        conn.send(payload)
+        if self.recorder:
+            self.recorder.record(media_trace.TO_TWILIO, payload)
+
+    def footprint(self):
+        """Bytes retained by the session: the object itself and everything it owns except the sockets and trace"""
+        total = sys.getsizeof(self)
+        for name in self.__slots__:
+            if name not in _EXTERNAL_SLOTS:
+                total += _retained_size(getattr(self, name))
+        return total
+
+    def close(self):
+        """Tear down the call: close the OpenAI socket and trace, and drop all socket references"""
+        with _sessions_lock:
+            active_sessions.pop(self.id, None)
+        openai_ws, self.openai_ws = self.openai_ws, None
+        if openai_ws is not None:
+            openai_ws.close()
+        recorder, self.recorder = self.recorder, None
+        if recorder is not None:
+            recorder.close()
+        self.twilio_ws = None
+        footprint = self.footprint()
+        if footprint > CALL_SESSION_BYTE_BUDGET:
+            logger.warning(f"Call {self.stream_sid} used {footprint} bytes of session state, "
+                           f"over the {CALL_SESSION_BYTE_BUDGET} byte budget")
+        logger.info(f"Call {self.stream_sid} closed after {time.monotonic() - self.started_at:.1f}s: "
+                    f"{self.frames_from_twilio} frames in, {self.frames_to_twilio} frames out, "
+                    f"{self.tool_calls} tool calls ({self.tool_ms:.1f}ms)")
+
+
+# Owned by the connection handling, not by the session
+_EXTERNAL_SLOTS = ('twilio_ws', 'openai_ws', 'recorder')
+
+
+def _retained_size(value):
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(_retained_size(item) for item in value.values())
+    if value is None:
+        return 0
+    return sys.getsizeof(value)
+
+
+# Sessions for calls currently in progress, keyed by session id
+active_sessions = {}
+_sessions_lock = threading.Lock()
+_next_session_id = 0
+
+
+def open_session(twilio_ws, recorder=None):
+    """Create and register the session for a new call"""
+    global _next_session_id
+    with _sessions_lock:
+        _next_session_id += 1
+        session = CallSession(_next_session_id, twilio_ws, recorder)
+        active_sessions[session.id] = session
+    return session
@@ -0,0 +1,2 @@
+# test_outgoing_call.py places a real call through Twilio, it is not part of the test suite
+collect_ignore = ['test_outgoing_call.py']
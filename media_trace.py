@@ -0,0 +1,113 @@
+import os
+import mmap
+import struct
+import threading
+import time
+import uuid
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Trace file layout:
+#   header: magic (4 bytes) + version (uint16)
+#   record: kind (uint8) + timestamp ns since recording start (uint64) + payload length (uint32) + payload
+# Payloads are the raw websocket text frames, UTF-8 encoded, exactly as they crossed the bridge.
+TRACE_MAGIC = b'TOTR'
+TRACE_VERSION = 1
+HEADER = struct.Struct('<4sH')
+RECORD = struct.Struct('<BQI')
+
+# Record kinds
+TWILIO_IN = 1     # Frame received from Twilio
+OPENAI_IN = 2     # Event received from OpenAI Realtime
+TO_OPENAI = 3     # Bridge output sent to OpenAI
+TO_TWILIO = 4     # Bridge output sent to Twilio
+
+INPUT_KINDS = (TWILIO_IN, OPENAI_IN)
+OUTPUT_KINDS = (TO_OPENAI, TO_TWILIO)
+
+# Set MEDIA_TRACE_DIR to record every media session into that directory
+MEDIA_TRACE_DIR = os.getenv('MEDIA_TRACE_DIR')
+
+
+class TraceRecorder:
+    """Append-only writer for a single call's media trace"""
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'wb')
+        self._file.write(HEADER.pack(TRACE_MAGIC, TRACE_VERSION))
+        self._start = time.monotonic_ns()
+        # Twilio frames and OpenAI events arrive on different threads
+        self._lock = threading.Lock()
+
+    def record(self, kind, payload):
+        """Append one frame to the trace"""
+        if isinstance(payload, str):
+            payload = payload.encode('utf-8')
+        with self._lock:
+            if self._file.closed:
+                return
+            # Taken under the lock so records from different threads stay in time order
+            timestamp = time.monotonic_ns() - self._start
+            self._file.write(RECORD.pack(kind, timestamp, len(payload)))
+            self._file.write(payload)
+
+    def close(self):
+        with self._lock:
+            if not self._file.closed:
+                self._file.close()
+
+
+def open_recorder():
+    """Create a recorder for a new media session, or None if recording is disabled"""
+    if not MEDIA_TRACE_DIR:
+        return None
+    os.makedirs(MEDIA_TRACE_DIR, exist_ok=True)
+    filename = f"{time.strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex[:8]}.trace"
+    path = os.path.join(MEDIA_TRACE_DIR, filename)
+    logger.info(f"Recording media trace to {path}")
+    return TraceRecorder(path)
+
+
+class TraceReader:
+    """Memory-mapped reader for a media trace file"""
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'rb')
+        if os.fstat(self._file.fileno()).st_size < HEADER.size:
+            self._file.close()
+            raise ValueError(f"{path} is not a media trace file")
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version = HEADER.unpack_from(self._map, 0)
+        if magic != TRACE_MAGIC:
+            self.close()
+            raise ValueError(f"{path} is not a media trace file")
+        if version != TRACE_VERSION:
+            self.close()
+            raise ValueError(f"Unsupported media trace version {version} in {path}")
+
+    def __iter__(self):
+        """Yield (kind, timestamp_ns, payload) tuples in recording order"""
+        offset = HEADER.size
+        end = len(self._map)
+        while offset + RECORD.size <= end:
+            kind, timestamp, length = RECORD.unpack_from(self._map, offset)
+            offset += RECORD.size
+            if offset + length > end:
+                # Recording was cut off mid-record (e.g. the process died)
+                logger.warning(f"Truncated record at end of {self.path}")
+                break
+            yield kind, timestamp, self._map[offset:offset + length].decode('utf-8')
+            offset += length
+
+    def close(self):
+        self._map.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
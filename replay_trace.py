@@ -0,0 +1,220 @@
+import sys
+import json
+import time
+import argparse
+import logging
+
+import bridge
+import media_trace
+from call_session import open_session
+from bridge import handle_twilio_message, handle_openai_message
+
+logger = logging.getLogger(__name__)
+
+
+class ReplaySocket:
+    """Stand-in for a Twilio or OpenAI websocket that captures what the bridge sends"""
+
+    def __init__(self, kind, replay):
+        self.kind = kind
+        self.replay = replay
+
+    def send(self, payload):
+        self.replay.capture(self.kind, payload)
+
+    def close(self):
+        pass
+
+
+class RecordedTools:
+    """Stand-in for the tool executor that answers each call with its recorded output.
+
+    Results are delivered at the point in the input stream where they were recorded,
+    so tools never run and their outputs interleave as they did on the live call."""
+
+    def __init__(self, records):
+        self.results = {}
+        for kind, timestamp, payload in records:
+            if kind != media_trace.TO_OPENAI or 'function_call_output' not in payload:
+                continue
+            msg = json.loads(payload)
+            item = msg.get('item', {})
+            if msg.get('type') == 'conversation.item.create' and item.get('type') == 'function_call_output':
+                self.results[item['call_id']] = (timestamp, item['output'])
+        self.pending = []
+        self.current_call_id = None
+
+    def submit(self, name, arguments, on_result):
+        # Tool calls come with their call_id on the message being handled
+        call_id = self.current_call_id
+        if call_id in self.results:
+            timestamp, output = self.results[call_id]
+        else:
+            # The live call ended before this result was sent, so it is only answered
+            # after the session is closed, where the send is dropped
+            logger.warning(f"No recorded result for tool call {call_id}")
+            timestamp, output = float('inf'), json.dumps({'error': "No recorded result"})
+        self.pending.append((timestamp, output, on_result))
+        return True
+
+    def deliver_until(self, timestamp=None):
+        """Deliver results recorded before timestamp, or all of them"""
+        ready = [entry for entry in self.pending if timestamp is None or entry[0] <= timestamp]
+        self.pending = [entry for entry in self.pending if entry not in ready]
+        for _, output, on_result in sorted(ready, key=lambda entry: entry[0]):
+            on_result(output, 0.0)
+
+
+class Replay:
+    """Feeds a recorded trace through the bridge handlers and captures their outputs"""
+
+    def __init__(self, realtime=False):
+        self.realtime = realtime
+        self.outputs = []
+        self._input_started = None
+
+    def capture(self, kind, payload):
+        latency = time.monotonic_ns() - self._input_started
+        self.outputs.append((kind, latency, payload))
+
+    def run(self, records):
+        session = open_session(ReplaySocket(media_trace.TO_TWILIO, self))
+        session.openai_ws = ReplaySocket(media_trace.TO_OPENAI, self)
+        tools = RecordedTools(records)
+        live_executor, bridge.tool_executor = bridge.tool_executor, tools
+        try:
+            self._feed(session, tools, records)
+        finally:
+            bridge.tool_executor = live_executor
+            session.close()
+            tools.deliver_until()
+
+    def _feed(self, session, tools, records):
+        start = time.monotonic_ns()
+        first_input = None
+        stopped = False
+        for kind, timestamp, payload in records:
+            if kind not in media_trace.INPUT_KINDS:
+                continue
+            if kind == media_trace.TWILIO_IN and stopped:
+                # The live receive loop stops reading at the stop frame
+                continue
+            if first_input is None:
+                # Recording starts before the OpenAI connection is set up, which is not replayed
+                first_input = timestamp
+            if self.realtime:
+                delay = (start + timestamp - first_input - time.monotonic_ns()) / 1e9
+                if delay > 0:
+                    time.sleep(delay)
+            tools.deliver_until(timestamp)
+            self._input_started = time.monotonic_ns()
+            if kind == media_trace.TWILIO_IN:
+                # OpenAI events keep arriving on their own thread until the session is closed
+                stopped = not handle_twilio_message(session, payload)
+            else:
+                tools.current_call_id = json.loads(payload).get('call_id')
+                handle_openai_message(session, payload)
+        if records:
+            # Every recorded result was sent before the live session closed
+            tools.deliver_until(records[-1][1])
+
+
+def output_channel(kind, payload):
+    """Outputs that one bridge thread sends in a fixed order.
+
+    On a live call the Twilio receive thread, the OpenAI socket thread and the tool
+    workers write to the trace concurrently, so outputs are only ordered within a channel."""
+    if kind == media_trace.TO_TWILIO:
+        return 'to_twilio'
+    if '"input_audio_buffer.append"' in payload:
+        return 'to_openai_audio'
+    return 'to_openai_control'
+
+
+def compare_outputs(expected, actual):
+    """Compare outputs channel by channel, returns (channel, index) of each mismatch"""
+    channels = {}
+    for side, outputs in ((0, expected), (1, actual)):
+        for kind, _, payload in outputs:
+            channels.setdefault(output_channel(kind, payload), ([], []))[side].append(payload)
+    mismatches = []
+    for channel, (want, got) in sorted(channels.items()):
+        for index, (want_payload, got_payload) in enumerate(zip(want, got)):
+            if want_payload != got_payload:
+                mismatches.append((channel, index))
+        if len(want) != len(got):
+            mismatches.append((channel, min(len(want), len(got))))
+    return mismatches
+
+
+def recorded_outputs(records):
+    """Pair each recorded output with its latency from the input that preceded it"""
+    outputs = []
+    last_input = None
+    for kind, timestamp, payload in records:
+        if kind in media_trace.INPUT_KINDS:
+            last_input = timestamp
+        elif last_input is not None:
+            # Outputs before the first input come from connection setup, which is not replayed
+            outputs.append((kind, timestamp - last_input, payload))
+    return outputs
+
+
+def latency_summary(outputs):
+    latencies = [latency / 1e6 for _, latency, _ in outputs]
+    if not latencies:
+        return {'mean': 0.0, 'max': 0.0}
+    return {'mean': sum(latencies) / len(latencies), 'max': max(latencies)}
+
+
+def replay_trace(path, realtime=False, latency_tolerance_ms=None):
+    """Replay a trace file and compare the bridge's outputs against the recording"""
+    with media_trace.TraceReader(path) as reader:
+        records = list(reader)
+
+    replay = Replay(realtime=realtime)
+    replay.run(records)
+
+    expected = recorded_outputs(records)
+    actual = replay.outputs
+    mismatches = compare_outputs(expected, actual)
+
+    result = {
+        'trace': path,
+        'inputs': sum(1 for kind, _, _ in records if kind in media_trace.INPUT_KINDS),
+        'expected_outputs': len(expected),
+        'actual_outputs': len(actual),
+        'mismatches': mismatches,
+        'recorded_latency_ms': latency_summary(expected),
+        'replay_latency_ms': latency_summary(actual)
+    }
+    result['passed'] = not mismatches
+    if latency_tolerance_ms is not None:
+        regression = result['replay_latency_ms']['mean'] - result['recorded_latency_ms']['mean']
+        result['passed'] = result['passed'] and regression <= latency_tolerance_ms
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay recorded media traces through the bridge")
+    parser.add_argument('traces', nargs='+', help="Trace files to replay")
+    parser.add_argument('--realtime', action='store_true', help="Replay with the recorded timing instead of as fast as possible")
+    parser.add_argument('--latency-tolerance-ms', type=float, help="Fail if mean output latency exceeds the recording by more than this")
+    args = parser.parse_args()
+
+    failed = 0
+    for path in args.traces:
+        result = replay_trace(path, realtime=args.realtime, latency_tolerance_ms=args.latency_tolerance_ms)
+        status = "PASS" if result['passed'] else "FAIL"
+        print(f"{status} {path}: {result['actual_outputs']}/{result['expected_outputs']} outputs, "
+              f"{len(result['mismatches'])} mismatches, "
+              f"mean latency {result['replay_latency_ms']['mean']:.3f}ms "
+              f"(recorded {result['recorded_latency_ms']['mean']:.3f}ms)")
+        if not result['passed']:
+            failed += 1
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
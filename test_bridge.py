@@ -0,0 +1,112 @@
+import json
+
+import bridge
+from call_session import open_session
+
+
+class FakeSocket:
+    def __init__(self):
+        self.sent = []
+
+    def send(self, payload):
+        self.sent.append(json.loads(payload))
+
+    def close(self):
+        pass
+
+
+class DeferredTools:
+    """Holds tool calls until the test decides to answer them"""
+
+    def __init__(self):
+        self.calls = []
+
+    def submit(self, name, arguments, on_result):
+        self.calls.append(on_result)
+        return True
+
+
+def openai_event(session, **msg):
+    bridge.handle_openai_message(session, json.dumps(msg))
+
+
+def sent_types(socket):
+    return [msg['type'] for msg in socket.sent]
+
+
+def test_one_response_create_after_parallel_tool_calls(monkeypatch):
+    tools = DeferredTools()
+    monkeypatch.setattr(bridge, 'tool_executor', tools)
+    openai_ws = FakeSocket()
+    session = open_session(FakeSocket())
+    session.openai_ws = openai_ws
+
+    openai_event(session, type='response.created')
+    openai_event(session, type='response.function_call_arguments.done', name='a', call_id='1', arguments='{}')
+    openai_event(session, type='response.function_call_arguments.done', name='b', call_id='2', arguments='{}')
+    tools.calls[0]('"first"', 1.0)
+    openai_event(session, type='response.done')
+    # The model's response is over but one result is still outstanding
+    assert sent_types(openai_ws) == ['conversation.item.create']
+
+    tools.calls[1]('"second"', 2.0)
+    assert sent_types(openai_ws) == ['conversation.item.create', 'conversation.item.create', 'response.create']
+    session.close()
+
+
+def test_synchronous_tool_result_waits_for_response_done(monkeypatch):
+    class ImmediateTools:
+        def submit(self, name, arguments, on_result):
+            on_result('{"error": "Unknown tool"}', 0.0)
+            return False
+
+    monkeypatch.setattr(bridge, 'tool_executor', ImmediateTools())
+    openai_ws = FakeSocket()
+    session = open_session(FakeSocket())
+    session.openai_ws = openai_ws
+
+    openai_event(session, type='response.function_call_arguments.done', name='nope', call_id='1', arguments='{}')
+    assert sent_types(openai_ws) == ['conversation.item.create']
+
+    openai_event(session, type='response.done')
+    assert sent_types(openai_ws) == ['conversation.item.create', 'response.create']
+
+    # Later responses without tool calls don't trigger another one
+    openai_event(session, type='response.created')
+    openai_event(session, type='response.done')
+    assert sent_types(openai_ws) == ['conversation.item.create', 'response.create']
+    session.close()
+
+
+def test_failed_submit_does_not_leave_call_outstanding(monkeypatch):
+    class BrokenTools:
+        def submit(self, name, arguments, on_result):
+            raise RuntimeError('cannot schedule new futures after shutdown')
+
+    monkeypatch.setattr(bridge, 'tool_executor', BrokenTools())
+    openai_ws = FakeSocket()
+    session = open_session(FakeSocket())
+    session.openai_ws = openai_ws
+
+    openai_event(session, type='response.function_call_arguments.done', name='a', call_id='1', arguments='{}')
+    openai_event(session, type='response.done')
+
+    assert session.pending_tool_calls == 0
+    assert sent_types(openai_ws) == ['conversation.item.create', 'response.create']
+    assert json.loads(openai_ws.sent[0]['item']['output']) == {'error': 'Tool a could not be run'}
+    session.close()
+
+
+def test_unanswered_submit_is_answered_with_error(monkeypatch):
+    class SilentTools:
+        def submit(self, name, arguments, on_result):
+            return False
+
+    monkeypatch.setattr(bridge, 'tool_executor', SilentTools())
+    session = open_session(FakeSocket())
+    session.openai_ws = FakeSocket()
+
+    openai_event(session, type='response.function_call_arguments.done', name='a', call_id='1', arguments='{}')
+
+    assert session.pending_tool_calls == 0
+    session.close()
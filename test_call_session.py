@@ -0,0 +1,167 @@
+import os
+import json
+import base64
+import threading
+import tracemalloc
+
+import bridge
+import call_session
+from call_session import CALL_SESSION_BYTE_BUDGET, active_sessions, open_session
+
+SESSIONS = 5000
+WARM_UP = 500
+HELD_OPEN = 1000
+
+# 20ms of 8kHz mu-law, as Twilio sends it
+TWILIO_FRAME = base64.b64encode(b'\xff' * 160).decode('ascii')
+OPENAI_DELTA = base64.b64encode(b'\x00' * 4800).decode('ascii')
+
+
+class FakeSocket:
+    def send(self, payload):
+        pass
+
+    def close(self):
+        pass
+
+
+SHARED_SOCKET = FakeSocket()
+
+
+def start_call(n):
+    session = open_session(SHARED_SOCKET)
+    session.openai_ws = SHARED_SOCKET
+    bridge.handle_twilio_message(session, json.dumps({
+        'event': 'start',
+        'start': {'streamSid': f'MZ{n:032x}', 'callSid': f'CA{n:032x}'}
+    }))
+    for _ in range(2):
+        bridge.handle_twilio_message(session, json.dumps({'event': 'media', 'media': {'payload': TWILIO_FRAME}}))
+        bridge.handle_openai_message(session, json.dumps({'type': 'response.audio.delta', 'delta': OPENAI_DELTA}))
+    return session
+
+
+def simulate_call(n):
+    session = start_call(n)
+    bridge.handle_twilio_message(session, json.dumps({'event': 'stop'}))
+    footprint = session.footprint()
+    session.close()
+    return footprint
+
+
+def current_rss_bytes():
+    """Resident set size right now, or None where /proc is not available"""
+    try:
+        with open('/proc/self/statm') as statm:
+            resident_pages = int(statm.read().split()[1])
+    except OSError:
+        return None
+    return resident_pages * os.sysconf('SC_PAGE_SIZE')
+
+
+def test_sessions_are_released_and_memory_stays_flat():
+    for n in range(WARM_UP):
+        simulate_call(n)
+
+    tracemalloc.start()
+    try:
+        baseline, _ = tracemalloc.get_traced_memory()
+        rss_before = current_rss_bytes()
+        for n in range(SESSIONS):
+            simulate_call(n)
+        current, _ = tracemalloc.get_traced_memory()
+        rss_after = current_rss_bytes()
+    finally:
+        tracemalloc.stop()
+
+    assert active_sessions == {}
+    # Anything retained per call would show up as SESSIONS times its size
+    assert current - baseline < 64 * 1024
+    if rss_before is not None:
+        assert rss_after - rss_before < 4 * 1024 * 1024
+
+
+def test_measured_memory_per_open_call_within_budget():
+    for n in range(WARM_UP):
+        simulate_call(n)
+
+    sessions = []
+    tracemalloc.start()
+    try:
+        baseline, _ = tracemalloc.get_traced_memory()
+        for n in range(HELD_OPEN):
+            sessions.append(start_call(n))
+        held, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+        for session in sessions:
+            session.close()
+
+    # Everything allocated for a call, including its registry entry, measured
+    # independently of footprint()
+    per_call = (held - baseline) / HELD_OPEN
+    assert per_call <= CALL_SESSION_BYTE_BUDGET
+    assert active_sessions == {}
+
+
+def test_footprint_stays_within_budget():
+    footprint = simulate_call(1)
+    assert footprint <= CALL_SESSION_BYTE_BUDGET
+
+
+def test_footprint_counts_retained_strings():
+    session = open_session(FakeSocket())
+    empty = session.footprint()
+    session.stream_sid = 'MZ' + 'a' * 32
+    session.audio_append['audio'] = TWILIO_FRAME
+    assert session.footprint() >= empty + len(session.stream_sid) + len(TWILIO_FRAME)
+    session.close()
+
+
+def test_sent_frames_are_not_retained():
+    session = open_session(FakeSocket())
+    session.openai_ws = FakeSocket()
+    bridge.handle_twilio_message(session, json.dumps({'event': 'media', 'media': {'payload': TWILIO_FRAME}}))
+    bridge.handle_openai_message(session, json.dumps({'type': 'response.audio.delta', 'delta': OPENAI_DELTA}))
+
+    assert session.audio_append['audio'] is None
+    assert session.media_out['media']['payload'] is None
+    session.close()
+
+
+def test_tool_counters_are_not_lost_across_threads(monkeypatch):
+    results = []
+
+    class CollectingTools:
+        def submit(self, name, arguments, on_result):
+            results.append(on_result)
+            return True
+
+    monkeypatch.setattr(bridge, 'tool_executor', CollectingTools())
+    session = open_session(FakeSocket())
+    session.openai_ws = FakeSocket()
+    for n in range(200):
+        bridge.handle_openai_message(session, json.dumps({
+            'type': 'response.function_call_arguments.done', 'name': 'tool', 'call_id': str(n), 'arguments': '{}'
+        }))
+
+    threads = [threading.Thread(target=on_result, args=('{}', 1.0)) for on_result in results]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert session.tool_calls == 200
+    assert session.tool_ms == 200.0
+    session.close()
+
+
+def test_close_unregisters_and_drops_sockets():
+    session = open_session(FakeSocket())
+    session.openai_ws = FakeSocket()
+    assert call_session.active_sessions[session.id] is session
+
+    session.close()
+
+    assert session.id not in call_session.active_sessions
+    assert session.twilio_ws is None and session.openai_ws is None
@@ -0,0 +1,104 @@
+import struct
+import threading
+
+import pytest
+
+import media_trace
+
+
+def write_trace(path, records):
+    recorder = media_trace.TraceRecorder(str(path))
+    for kind, payload in records:
+        recorder.record(kind, payload)
+    recorder.close()
+
+
+def test_round_trip(tmp_path):
+    path = tmp_path / 'call.trace'
+    write_trace(path, [
+        (media_trace.TWILIO_IN, '{"event": "start"}'),
+        (media_trace.OPENAI_IN, b'{"type": "session.updated"}'),
+        (media_trace.TO_TWILIO, '{"event": "media", "note": "café"}'),
+    ])
+
+    with media_trace.TraceReader(str(path)) as reader:
+        records = list(reader)
+
+    assert [(kind, payload) for kind, _, payload in records] == [
+        (media_trace.TWILIO_IN, '{"event": "start"}'),
+        (media_trace.OPENAI_IN, '{"type": "session.updated"}'),
+        (media_trace.TO_TWILIO, '{"event": "media", "note": "café"}'),
+    ]
+    timestamps = [timestamp for _, timestamp, _ in records]
+    assert timestamps == sorted(timestamps)
+
+
+def test_record_after_close_is_ignored(tmp_path):
+    path = tmp_path / 'call.trace'
+    recorder = media_trace.TraceRecorder(str(path))
+    recorder.record(media_trace.TWILIO_IN, 'first')
+    recorder.close()
+    recorder.record(media_trace.TWILIO_IN, 'second')
+
+    with media_trace.TraceReader(str(path)) as reader:
+        assert [payload for _, _, payload in reader] == ['first']
+
+
+def test_truncated_final_record_is_dropped(tmp_path):
+    path = tmp_path / 'call.trace'
+    write_trace(path, [
+        (media_trace.TWILIO_IN, 'complete'),
+        (media_trace.OPENAI_IN, 'cut off mid-payload'),
+    ])
+    data = path.read_bytes()
+    path.write_bytes(data[:-5])
+
+    with media_trace.TraceReader(str(path)) as reader:
+        assert [payload for _, _, payload in reader] == ['complete']
+
+
+@pytest.mark.parametrize('contents', [
+    b'',
+    b'TO',
+    b'NOPE\x01\x00',
+])
+def test_rejects_files_that_are_not_traces(tmp_path, contents):
+    path = tmp_path / 'bad.trace'
+    path.write_bytes(contents)
+
+    with pytest.raises(ValueError, match='not a media trace file'):
+        media_trace.TraceReader(str(path))
+
+
+def test_rejects_unknown_version(tmp_path):
+    path = tmp_path / 'future.trace'
+    path.write_bytes(struct.pack('<4sH', media_trace.TRACE_MAGIC, media_trace.TRACE_VERSION + 1))
+
+    with pytest.raises(ValueError, match='Unsupported media trace version'):
+        media_trace.TraceReader(str(path))
+
+
+def test_open_recorder_is_disabled_without_trace_dir(monkeypatch):
+    monkeypatch.setattr(media_trace, 'MEDIA_TRACE_DIR', None)
+    assert media_trace.open_recorder() is None
+
+
+def test_concurrent_records_stay_in_time_order(tmp_path):
+    path = tmp_path / 'call.trace'
+    recorder = media_trace.TraceRecorder(str(path))
+
+    def record_many(kind):
+        for _ in range(2000):
+            recorder.record(kind, 'frame')
+
+    threads = [threading.Thread(target=record_many, args=(kind,)) for kind in media_trace.INPUT_KINDS]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    recorder.close()
+
+    with media_trace.TraceReader(str(path)) as reader:
+        timestamps = [timestamp for _, timestamp, _ in reader]
+    assert len(timestamps) == 4000
+    assert timestamps == sorted(timestamps)
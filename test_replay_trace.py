@@ -0,0 +1,130 @@
+import json
+import time
+
+import media_trace
+from replay_trace import replay_trace
+
+
+def record_call(path, records):
+    recorder = media_trace.TraceRecorder(str(path))
+    for kind, msg in records:
+        recorder.record(kind, json.dumps(msg))
+    recorder.close()
+
+
+def test_replay_matches_recording(tmp_path):
+    path = tmp_path / 'call.trace'
+    record_call(path, [
+        (media_trace.TO_OPENAI, {'type': 'session.update', 'session': {}}),
+        (media_trace.TWILIO_IN, {'event': 'start', 'start': {'streamSid': 'MZ1', 'callSid': 'CA1'}}),
+        (media_trace.TWILIO_IN, {'event': 'media', 'media': {'payload': 'AAAA'}}),
+        (media_trace.TO_OPENAI, {'type': 'input_audio_buffer.append', 'audio': 'AAAA'}),
+        (media_trace.OPENAI_IN, {'type': 'response.audio.delta', 'delta': 'BBBB'}),
+        (media_trace.TO_TWILIO, {'event': 'media', 'streamSid': 'MZ1', 'media': {'payload': 'BBBB'}}),
+        (media_trace.TWILIO_IN, {'event': 'stop'}),
+    ])
+
+    result = replay_trace(str(path))
+
+    assert result['passed']
+    assert result['inputs'] == 4
+    assert result['expected_outputs'] == result['actual_outputs'] == 2
+    assert result['mismatches'] == []
+
+
+def test_replay_reports_changed_output(tmp_path):
+    path = tmp_path / 'call.trace'
+    record_call(path, [
+        (media_trace.TWILIO_IN, {'event': 'media', 'media': {'payload': 'AAAA'}}),
+        (media_trace.TO_OPENAI, {'type': 'input_audio_buffer.append', 'audio': 'CCCC'}),
+    ])
+
+    result = replay_trace(str(path))
+
+    assert not result['passed']
+    assert result['mismatches'] == [('to_openai_audio', 0)]
+
+
+def test_realtime_replay_skips_connection_setup(tmp_path):
+    path = tmp_path / 'call.trace'
+    recorder = media_trace.TraceRecorder(str(path))
+    recorder.record(media_trace.TO_OPENAI, json.dumps({'type': 'session.update', 'session': {}}))
+    time.sleep(0.5)
+    recorder.record(media_trace.TWILIO_IN, json.dumps({'event': 'stop'}))
+    recorder.close()
+
+    started = time.monotonic()
+    result = replay_trace(str(path), realtime=True)
+
+    assert result['passed']
+    assert time.monotonic() - started < 0.25
+
+
+def test_replay_answers_tool_calls_from_recording(tmp_path):
+    path = tmp_path / 'call.trace'
+    output = json.dumps({'id': 42, 'status': 'pending'})
+    record_call(path, [
+        (media_trace.OPENAI_IN, {'type': 'response.created'}),
+        (media_trace.OPENAI_IN, {'type': 'response.function_call_arguments.done',
+                                 'name': 'schedule_callback', 'call_id': 'call_1', 'arguments': '{}'}),
+        (media_trace.OPENAI_IN, {'type': 'response.audio.delta', 'delta': 'BBBB'}),
+        (media_trace.TO_TWILIO, {'event': 'media', 'streamSid': None, 'media': {'payload': 'BBBB'}}),
+        (media_trace.TO_OPENAI, {'type': 'conversation.item.create',
+                                 'item': {'type': 'function_call_output', 'call_id': 'call_1', 'output': output}}),
+        (media_trace.OPENAI_IN, {'type': 'response.done'}),
+        (media_trace.TO_OPENAI, {'type': 'response.create'}),
+        (media_trace.TWILIO_IN, {'event': 'stop'}),
+    ])
+
+    result = replay_trace(str(path))
+
+    assert result['passed'], result
+    assert result['actual_outputs'] == 3
+
+
+def test_replay_accepts_cross_thread_interleaving(tmp_path):
+    path = tmp_path / 'call.trace'
+    # Twilio and OpenAI frames were handled concurrently, so the outputs landed in the
+    # opposite order from the inputs that caused them
+    record_call(path, [
+        (media_trace.TWILIO_IN, {'event': 'media', 'media': {'payload': 'AAAA'}}),
+        (media_trace.OPENAI_IN, {'type': 'response.audio.delta', 'delta': 'BBBB'}),
+        (media_trace.TO_TWILIO, {'event': 'media', 'streamSid': None, 'media': {'payload': 'BBBB'}}),
+        (media_trace.TO_OPENAI, {'type': 'input_audio_buffer.append', 'audio': 'AAAA'}),
+    ])
+
+    result = replay_trace(str(path))
+
+    assert result['passed'], result
+    assert result['mismatches'] == []
+
+
+def test_replay_continues_openai_events_after_stop(tmp_path):
+    path = tmp_path / 'call.trace'
+    record_call(path, [
+        (media_trace.TWILIO_IN, {'event': 'stop'}),
+        (media_trace.OPENAI_IN, {'type': 'response.audio.delta', 'delta': 'BBBB'}),
+        (media_trace.TO_TWILIO, {'event': 'media', 'streamSid': None, 'media': {'payload': 'BBBB'}}),
+        (media_trace.TWILIO_IN, {'event': 'media', 'media': {'payload': 'AAAA'}}),
+    ])
+
+    result = replay_trace(str(path))
+
+    assert result['passed'], result
+    assert result['actual_outputs'] == 1
+
+
+def test_replay_drops_tool_result_missing_from_recording(tmp_path):
+    path = tmp_path / 'call.trace'
+    # The call hung up before the tool finished, so no result was sent
+    record_call(path, [
+        (media_trace.OPENAI_IN, {'type': 'response.function_call_arguments.done',
+                                 'name': 'schedule_callback', 'call_id': 'call_1', 'arguments': '{}'}),
+        (media_trace.OPENAI_IN, {'type': 'response.done'}),
+        (media_trace.TWILIO_IN, {'event': 'stop'}),
+    ])
+
+    result = replay_trace(str(path))
+
+    assert result['passed'], result
+    assert result['actual_outputs'] == 0
@@ -0,0 +1,99 @@
+import json
+import time
+import threading
+
+import pytest
+
+import tool_executor
+from tool_executor import ToolExecutor, register_tool
+
+
+@pytest.fixture
+def registry(monkeypatch):
+    monkeypatch.setattr(tool_executor, 'TOOL_REGISTRY', {})
+    return tool_executor.TOOL_REGISTRY
+
+
+def collect():
+    results = []
+    done = threading.Event()
+
+    def on_result(output, elapsed_ms):
+        results.append(json.loads(output))
+        done.set()
+    return results, on_result
+
+
+def test_queue_wait_does_not_count_toward_timeout(registry):
+    ran = []
+
+    @register_tool('slow', 'Sleeps', {}, timeout=0.2)
+    def slow(n):
+        time.sleep(0.1)
+        ran.append(n)
+        return n
+
+    executor = ToolExecutor(max_workers=1)
+    results, on_result = collect()
+    for n in range(3):
+        executor.submit('slow', json.dumps({'n': n}), on_result)
+    assert executor.wait_idle(timeout=5)
+
+    assert ran == [0, 1, 2]
+    assert sorted(results) == [0, 1, 2]
+
+
+def test_timed_out_tool_is_reported_once(registry):
+    release = threading.Event()
+
+    @register_tool('stuck', 'Never returns in time', {}, timeout=0.05)
+    def stuck():
+        release.wait(5)
+        return 'late'
+
+    executor = ToolExecutor(max_workers=1)
+    results, on_result = collect()
+    executor.submit('stuck', '', on_result)
+    time.sleep(0.2)
+    release.set()
+    assert executor.wait_idle(timeout=5)
+
+    assert results == [{'error': 'Tool stuck timed out'}]
+    assert executor.stats()['stuck']['timeouts'] == 1
+
+
+def test_idempotent_results_are_cached(registry):
+    calls = []
+
+    @register_tool('lookup', 'Looks something up', {}, idempotent=True)
+    def lookup(q):
+        calls.append(q)
+        return {'q': q}
+
+    executor = ToolExecutor()
+    results, on_result = collect()
+    executor.submit('lookup', '{"q": 1}', on_result)
+    executor.wait_idle(timeout=5)
+    assert executor.submit('lookup', '{"q": 1}', on_result) is False
+
+    assert calls == [1]
+    assert results == [{'q': 1}, {'q': 1}]
+
+
+def test_unknown_tool_and_saturation_answer_immediately(registry):
+    release = threading.Event()
+
+    @register_tool('block', 'Blocks', {})
+    def block():
+        release.wait(5)
+
+    executor = ToolExecutor(max_workers=1, max_pending=1)
+    results, on_result = collect()
+    assert executor.submit('missing', '', on_result) is False
+    assert executor.submit('block', '', on_result) is True
+    assert executor.submit('block', '', on_result) is False
+    release.set()
+    executor.wait_idle(timeout=5)
+
+    assert results[0] == {'error': 'Unknown tool: missing'}
+    assert results[1] == {'error': 'Tool is busy, please try again'}
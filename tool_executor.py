@@ -0,0 +1,197 @@
+import os
+import json
+import time
+import threading
+import logging
+import traceback
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+# Tool execution limits
+TOOL_MAX_WORKERS = int(os.getenv('TOOL_MAX_WORKERS', 8))
+TOOL_MAX_PENDING = int(os.getenv('TOOL_MAX_PENDING', 32))
+TOOL_TIMEOUT_SECONDS = float(os.getenv('TOOL_TIMEOUT_SECONDS', 10))
+TOOL_CACHE_SIZE = int(os.getenv('TOOL_CACHE_SIZE', 256))
+TOOL_CACHE_TTL_SECONDS = float(os.getenv('TOOL_CACHE_TTL_SECONDS', 300))
+
+# Tools offered to the model, keyed by name
+TOOL_REGISTRY = {}
+
+
+def register_tool(name, description, parameters, idempotent=False, timeout=TOOL_TIMEOUT_SECONDS):
+    """Decorator that registers a function as a tool the model can call.
+
+    Idempotent tools have their results cached by arguments."""
+    def decorator(func):
+        TOOL_REGISTRY[name] = {
+            'function': func,
+            'description': description,
+            'parameters': parameters,
+            'idempotent': idempotent,
+            'timeout': timeout
+        }
+        return func
+    return decorator
+
+
+def tool_definitions():
+    """Tool definitions for the Realtime session configuration"""
+    return [
+        {
+            'type': 'function',
+            'name': name,
+            'description': tool['description'],
+            'parameters': tool['parameters']
+        }
+        for name, tool in TOOL_REGISTRY.items()
+    ]
+
+
+class ToolExecutor:
+    """Bounded worker pool that runs tool calls off the websocket threads"""
+
+    def __init__(self, max_workers=TOOL_MAX_WORKERS, max_pending=TOOL_MAX_PENDING,
+                 cache_size=TOOL_CACHE_SIZE, cache_ttl=TOOL_CACHE_TTL_SECONDS):
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='tool')
+        self._max_pending = max_pending
+        self._pending = 0
+        self._idle = threading.Condition()
+        self._cache = OrderedDict()
+        self._cache_size = cache_size
+        self._cache_ttl = cache_ttl
+        self._cache_lock = threading.Lock()
+        self._stats = {}
+        self._stats_lock = threading.Lock()
+
+    def submit(self, name, arguments, on_result):
+        """Run a tool call in the background.
+
+        on_result(output, elapsed_ms) is called exactly once with the JSON-encoded
+        output, from a worker or timer thread. Returns False if the call was
+        answered immediately without running (unknown tool, bad arguments, cache
+        hit or pool saturated).
+
+        The timeout starts when a worker picks the call up, so time spent queued
+        does not count. A tool that has already started cannot be cancelled: on
+        timeout the model is told the call failed, but the tool runs to completion
+        and its result is discarded."""
+        started = time.monotonic()
+        tool = TOOL_REGISTRY.get(name)
+        if tool is None:
+            logger.warning(f"Model called unknown tool: {name}")
+            on_result(json.dumps({'error': f"Unknown tool: {name}"}), 0.0)
+            return False
+
+        try:
+            args = json.loads(arguments) if arguments else {}
+        except ValueError as e:
+            on_result(json.dumps({'error': f"Invalid arguments: {str(e)}"}), 0.0)
+            self._record(name, 'errors', 0.0)
+            return False
+
+        cache_key = None
+        if tool['idempotent']:
+            cache_key = (name, json.dumps(args, sort_keys=True))
+            output = self._cache_get(cache_key)
+            if output is not None:
+                elapsed_ms = (time.monotonic() - started) * 1000
+                self._record(name, 'cache_hits', elapsed_ms)
+                on_result(output, elapsed_ms)
+                return False
+
+        with self._idle:
+            if self._pending >= self._max_pending:
+                saturated = True
+            else:
+                saturated = False
+                self._pending += 1
+        if saturated:
+            logger.warning(f"Tool pool saturated, rejecting call to {name}")
+            self._record(name, 'errors', 0.0)
+            on_result(json.dumps({'error': "Tool is busy, please try again"}), 0.0)
+            return False
+
+        delivered = threading.Lock()
+
+        def deliver(output, outcome):
+            # Whichever of the worker and the timeout fires first wins
+            if not delivered.acquire(blocking=False):
+                return
+            timer.cancel()
+            elapsed_ms = (time.monotonic() - started) * 1000
+            self._record(name, outcome, elapsed_ms)
+            logger.info(f"Tool {name} finished ({outcome}) in {elapsed_ms:.1f}ms")
+            try:
+                on_result(output, elapsed_ms)
+            except Exception as e:
+                logger.error(f"Error delivering result of tool {name}: {str(e)}")
+                logger.error(traceback.format_exc())
+
+        def on_timeout():
+            deliver(json.dumps({'error': f"Tool {name} timed out"}), 'timeouts')
+
+        def run():
+            try:
+                timer.start()
+                output = json.dumps(tool['function'](**args))
+                if cache_key is not None:
+                    self._cache_put(cache_key, output)
+                deliver(output, 'calls')
+            except Exception as e:
+                logger.error(f"Error running tool {name}: {str(e)}")
+                logger.error(traceback.format_exc())
+                deliver(json.dumps({'error': str(e)}), 'errors')
+            finally:
+                with self._idle:
+                    self._pending -= 1
+                    self._idle.notify_all()
+
+        timer = threading.Timer(tool['timeout'], on_timeout)
+        timer.daemon = True
+        self._pool.submit(run)
+        return True
+
+    def wait_idle(self, timeout=None):
+        """Block until no tool calls are running, returns False on timeout"""
+        with self._idle:
+            return self._idle.wait_for(lambda: self._pending == 0, timeout)
+
+    def stats(self):
+        """Per-tool call counts and latency in milliseconds"""
+        with self._stats_lock:
+            return {name: dict(stats) for name, stats in self._stats.items()}
+
+    def _record(self, name, outcome, elapsed_ms):
+        with self._stats_lock:
+            stats = self._stats.setdefault(name, {
+                'calls': 0, 'errors': 0, 'timeouts': 0, 'cache_hits': 0,
+                'total_ms': 0.0, 'max_ms': 0.0
+            })
+            stats[outcome] += 1
+            stats['total_ms'] += elapsed_ms
+            stats['max_ms'] = max(stats['max_ms'], elapsed_ms)
+
+    def _cache_get(self, key):
+        with self._cache_lock:
+            entry = self._cache.get(key)
+            if entry is None:
+                return None
+            expires_at, output = entry
+            if expires_at < time.monotonic():
+                del self._cache[key]
+                return None
+            self._cache.move_to_end(key)
+            return output
+
+    def _cache_put(self, key, output):
+        with self._cache_lock:
+            self._cache[key] = (time.monotonic() + self._cache_ttl, output)
+            self._cache.move_to_end(key)
+            while len(self._cache) > self._cache_size:
+                self._cache.popitem(last=False)
+
+
+# Shared by all calls
+executor = ToolExecutor()
@@ -1,6 +1,5 @@
 import os
 import json
-import base64
 import asyncio
 import websockets
 import logging
@@ -15,6 +14,10 @@ from datetime import datetime, timezone
 import requests
 import time
 import websocket
+import media_trace
+from call_session import open_session, active_sessions
+from tool_executor import register_tool, tool_definitions
+from bridge import handle_twilio_message, handle_openai_message
 
 # Load environment variables
 load_dotenv()
@@ -43,10 +46,6 @@ VOICE = "echo"  # Options: alloy, ash, ballad, coral, echo, sage, shimmer, verse
 SYSTEM_MESSAGE = "You are Claude, a helpful AI assistant speaking with Gus. Keep your responses concise and conversational. You're speaking on a phone call."
 LOG_EVENT_TYPES = ["session.updated", "response.text.delta", "turn.start", "turn.end", "error"]
 
-# Counter for audio packets
-audio_packets_from_twilio = 0
-audio_packets_to_twilio = 0
-
 def validate_phone_number(phone_number):
     """Validate phone number format and add + prefix if needed"""
     # Remove any spaces or special characters
@@ -83,6 +82,7 @@ def index():
         json.dumps({
             "status": "healthy",
             "version": "1.0.0",
+            "active_calls": len(active_sessions),
             "endpoints": [
                 "/voice",
                 "/media-stream",
@@ -167,6 +167,50 @@ def schedule_call():
             mimetype='application/json'
         )
 
+@register_tool(
+    'schedule_callback',
+    "Schedule a callback to the caller at a future time.",
+    {
+        'type': 'object',
+        'properties': {
+            'phone_number': {
+                'type': 'string',
+                'description': "US phone number to call back"
+            },
+            'scheduled_time': {
+                'type': 'string',
+                'description': "When to call back, in ISO format (YYYY-MM-DDTHH:MM:SSZ)"
+            },
+            'reason': {
+                'type': 'string',
+                'description': "Short note on what the callback is about"
+            }
+        },
+        'required': ['phone_number', 'scheduled_time']
+    }
+)
+def schedule_callback(phone_number, scheduled_time, reason=None):
+    """Tool: book a callback in the scheduled_calls table"""
+    phone_number = validate_phone_number(phone_number)
+    scheduled_time = validate_scheduled_time(scheduled_time)
+    
+    result = supabase.table('scheduled_calls').insert({
+        'phone_number': phone_number,
+        'scheduled_time': scheduled_time,
+        'status': 'pending',
+        'metadata': {'reason': reason, 'source': 'voice_assistant'},
+        'voice_url': f"https://{RENDER_URL}/voice",
+        'callback_url': f"https://{RENDER_URL}/call_status"
+    }).execute()
+    
+    logger.info(f"Callback scheduled from call: {result.data[0]}")
+    return {
+        'id': result.data[0]['id'],
+        'phone_number': phone_number,
+        'scheduled_time': scheduled_time,
+        'status': 'pending'
+    }
+
 def check_scheduled_calls():
     """Background task to check for and execute scheduled calls"""
     logger.info("Starting scheduled calls checker")
@@ -314,6 +358,8 @@ def create_openai_session():
                 'silence_duration_ms': 500,
                 'create_response': True
             },
+            'tools': tool_definitions(),
+            'tool_choice': 'auto',
             'temperature': 0.8,
             'max_response_output_tokens': 'inf'
         }
@@ -328,10 +374,11 @@ def create_openai_session():
 
 def handle_media_stream(ws):
     """Handle media stream from Twilio"""
+    session = open_session(ws, media_trace.open_recorder())
     try:
         # Create OpenAI session
-        session = create_openai_session()
-        client_secret = session['client_secret']['value']
+        openai_session = create_openai_session()
+        client_secret = openai_session['client_secret']['value']
         
         # Connect to OpenAI WebSocket
         openai_ws = websocket.WebSocketApp(
@@ -341,11 +388,12 @@ def handle_media_stream(ws):
                 'Content-Type': 'application/json',
                 'OpenAI-Beta': 'realtime=v1'
             },
-            on_message=lambda ws, msg: handle_openai_message(ws, msg, ws),
-            on_error=lambda ws, error: logger.error(f"OpenAI WebSocket error: {error}"),
-            on_close=lambda ws, code, reason: logger.info(f"OpenAI WebSocket closed: {code} - {reason}"),
-            on_open=lambda ws: logger.info("OpenAI WebSocket opened")
+            on_message=lambda openai_conn, msg: handle_openai_message(session, msg),
+            on_error=lambda openai_conn, error: logger.error(f"OpenAI WebSocket error: {error}"),
+            on_close=lambda openai_conn, code, reason: logger.info(f"OpenAI WebSocket closed: {code} - {reason}"),
+            on_open=lambda openai_conn: logger.info("OpenAI WebSocket opened")
         )
+        session.openai_ws = openai_ws
         
         # Start OpenAI WebSocket connection
         openai_ws_thread = threading.Thread(target=lambda: openai_ws.run_forever(ping_interval=30, ping_timeout=10))
@@ -362,7 +410,7 @@ def handle_media_stream(ws):
         logger.info("OpenAI WebSocket connected")
         
         # Send initial session configuration
-        openai_ws.send(json.dumps({
+        session.send_to_openai({
             'type': 'session.update',
             'session': {
                 'modalities': ['audio', 'text'],
@@ -376,29 +424,18 @@ def handle_media_stream(ws):
                     'prefix_padding_ms': 300,
                     'silence_duration_ms': 500,
                     'create_response': True
-                }
+                },
+                'tools': tool_definitions(),
+                'tool_choice': 'auto'
             }
-        }))
+        })
         
         # Handle Twilio audio stream
         while True:
             message = ws.receive()
             if message is None:
                 break
-                
-            # Parse Twilio message
-            twilio_msg = json.loads(message)
-            if twilio_msg['event'] == 'media':
-                # Decode audio data
-                audio_data = base64.b64decode(twilio_msg['media']['payload'])
-                
-                # Send audio to OpenAI
-                openai_ws.send(json.dumps({
-                    'type': 'input_audio_buffer.append',
-                    'audio': base64.b64encode(audio_data).decode('utf-8')
-                }))
-                
-            elif twilio_msg['event'] == 'stop':
+            if not handle_twilio_message(session, message):
                 break
                 
     except Exception as e:
@@ -406,38 +443,7 @@ def handle_media_stream(ws):
         logger.error(traceback.format_exc())
         raise
     finally:
-        if 'openai_ws' in locals():
-            openai_ws.close()
-
-def handle_openai_message(ws, message, twilio_ws):
-    """Handle messages from OpenAI WebSocket"""
-    try:
-        msg = json.loads(message)
-        msg_type = msg.get('type')
-        
-        if msg_type == 'response.audio.delta':
-            # Send audio to Twilio
-            audio_data = base64.b64decode(msg['delta'])
-            twilio_ws.send(json.dumps({
-                'event': 'media',
-                'streamSid': twilio_ws.stream_sid if hasattr(twilio_ws, 'stream_sid') else None,
-                'media': {
-                    'payload': base64.b64encode(audio_data).decode('utf-8')
-                }
-            }))
-            
-        elif msg_type == 'error':
-            logger.error(f"OpenAI error: {msg['error']}")
-            
-        elif msg_type == 'session.updated':
-            logger.info("Session configuration updated")
-            
-        elif msg_type == 'response.text.delta':
-            logger.info(f"AI response: {msg.get('delta', '')}")
-            
-    except Exception as e:
-        logger.error(f"Error handling OpenAI message: {str(e)}")
-        logger.error(traceback.format_exc())
+        session.close()
 
 @app.route('/voice', methods=['POST'])
 def voice():